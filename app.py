@@ -1,21 +1,56 @@
 from flask import Flask
+from sqlalchemy import event
 from extensions import db
+from config import Config, engine_options
 from routes.create_Category import categories_bp
 from routes.create_forms import forms_bp
+from commands import register_commands
+from services.image_storage import variant_workers
+from services.instrumentation import instrumentation
+from services.schema_cache import schema_cache
 
 
 
 
 
-def create_app():
+def configure_sqlite(engine, wal=True, foreign_keys=True):
+    # Las llaves foráneas se configuran aparte de WAL para no perderlas al apagarlo
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if foreign_keys:
+            cursor.execute('PRAGMA foreign_keys=ON')
+        if wal:
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
+
+def create_app(config=None):
     app = Flask(__name__)
 
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'mysql+pymysql://root:@localhost/warehouse_personal'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.from_object(Config)
+    if config:
+        app.config.update(config)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
 
     db.init_app(app)
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        with app.app_context():
+            configure_sqlite(
+                db.engine,
+                wal=app.config['SQLITE_WAL'],
+                foreign_keys=app.config['SQLITE_FOREIGN_KEYS']
+            )
+    variant_workers.configure(
+        app.config['IMAGE_VARIANT_WORKERS'],
+        app.config['IMAGE_VARIANT_QUEUE_SIZE']
+    )
+    schema_cache.init_app(app)
     app.register_blueprint(categories_bp)
     app.register_blueprint(forms_bp)
+    instrumentation.init_app(app)
+    register_commands(app)
     
 
     return app
@@ -23,4 +58,4 @@ def create_app():
 
 if __name__ == '__main__':
     app = create_app()
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,305 @@
+# Benchmark de endpoints contra una base SQLite local.
+#
+#   python -m benchmarks.bench_endpoints --submissions 2000 --threads 4 --output benchmarks/baseline.json
+#   python -m benchmarks.bench_endpoints --compare benchmarks/baseline.json
+#
+# Siembra categorías, campos, opciones y submissions a través del test client
+# de Flask, mide throughput, latencias p50/p95/p99 y consultas por request, y
+# guarda el resultado en JSON para compararlo entre versiones.
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import sqlalchemy
+from sqlalchemy import event
+
+from app import create_app
+from extensions import db
+from services.schema_cache import schema_cache
+
+FIELD_TYPES = ('text', 'number', 'select', 'date')
+DEFAULT_TOLERANCE = 0.25
+
+
+class QueryCounter:
+    # Consultas por hilo, para atribuirlas al request que las ejecutó
+
+    def __init__(self, engine):
+        self._local = threading.local()
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self._local, 'count', 0)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    low = int(k)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (k - low)
+
+
+def summarize(samples, wall_time):
+    latencies = sorted(latency for latency, _, _ in samples)
+    queries = [n for _, n, _ in samples]
+    errors = sum(1 for _, _, status in samples if status >= 400)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'wall_time_s': round(wall_time, 4),
+        'throughput_rps': round(len(samples) / wall_time, 2) if wall_time else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else 0.0
+    }
+
+
+def timed(client, counter, method, url, **kwargs):
+    counter.reset()
+    started = time.perf_counter()
+    response = getattr(client, method)(url, **kwargs)
+    response.get_data()
+    response.close()
+    return (time.perf_counter() - started, counter.count, response.status_code), response
+
+
+def run_serial(client, counter, requests):
+    samples = []
+    responses = []
+    started = time.perf_counter()
+    for method, url, kwargs in requests:
+        sample, response = timed(client, counter, method, url, **kwargs)
+        samples.append(sample)
+        responses.append(response)
+    return summarize(samples, time.perf_counter() - started), responses
+
+
+def run_threaded(app, counter, requests, threads):
+    # Generador de carga: cada hilo usa su propio test client
+    chunks = [requests[i::threads] for i in range(threads)]
+
+    def worker(chunk):
+        client = app.test_client()
+        return [timed(client, counter, method, url, **kwargs)[0] for method, url, kwargs in chunk]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(worker, chunks))
+    wall_time = time.perf_counter() - started
+    return summarize([sample for result in results for sample in result], wall_time)
+
+
+def submission_form(category, rng):
+    data = {'category_id': category['id']}
+    for field in category['fields']:
+        key = f"field_{field['id']}"
+        if field['field_type'] == 'number':
+            data[key] = str(rng.randint(0, 1000))
+        elif field['field_type'] == 'date':
+            data[key] = f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}'
+        elif field['field_type'] == 'select' and field['options']:
+            data[key] = rng.choice(field['options'])
+        else:
+            data[key] = f'value {rng.randint(0, 10 ** 6)}'
+    return data
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': args.database_uri,
+        'SQL_INSTRUMENTATION': False,
+        # Sin revalidaciones por tiempo: las consultas por request no deben
+        # depender de cuánto dura la corrida
+        'SCHEMA_CACHE_CHECK_SECONDS': 10 ** 9
+    })
+    schema_cache.clear()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        counter = QueryCounter(db.engine)
+
+    client = app.test_client()
+    results = {}
+
+    # Categorías
+    results['POST /create/categories'], responses = run_serial(client, counter, [
+        ('post', '/create/categories', {'json': {'name': f'Category {i}', 'description': 'benchmark'}})
+        for i in range(args.categories)
+    ])
+    categories = [{'id': r.get_json()['id'], 'fields': []} for r in responses]
+
+    # Campos, un request por categoría
+    results['POST /create/category-fields'], responses = run_serial(client, counter, [
+        ('post', '/create/category-fields', {'json': {'fields': [
+            {
+                'category_id': category['id'],
+                'name': f'field {j}',
+                'field_type': FIELD_TYPES[j % len(FIELD_TYPES)],
+                'required': j % 2
+            }
+            for j in range(args.fields)
+        ]}})
+        for category in categories
+    ])
+    for category, response in zip(categories, responses):
+        category['fields'] = [
+            {'id': f['id'], 'field_type': f['field_type'], 'options': []}
+            for f in response.get_json()
+        ]
+
+    # Opciones, un request por campo select
+    select_fields = [f for c in categories for f in c['fields'] if f['field_type'] == 'select']
+    results['POST /field-options'], _ = run_serial(client, counter, [
+        ('post', '/field-options', {'json': {'options': [
+            {'field_id': field['id'], 'value': f'option {k}'} for k in range(args.options)
+        ]}})
+        for field in select_fields
+    ])
+    for field in select_fields:
+        field['options'] = [f'option {k}' for k in range(args.options)]
+
+    # Submissions: primero en serie y luego con el generador de carga
+    submissions = [
+        ('post', '/submissions', {'data': submission_form(rng.choice(categories), rng)})
+        for _ in range(args.submissions)
+    ]
+    half = len(submissions) // 2
+    results['POST /submissions'], _ = run_serial(client, counter, submissions[:half])
+    results[f'POST /submissions ({args.threads} threads)'] = run_threaded(
+        app, counter, submissions[half:], args.threads
+    )
+
+    with app.app_context():
+        db.engine.dispose()
+
+    return {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'platform': platform.platform(),
+            'database': args.database_uri.split(':', 1)[0],
+            'params': {
+                'categories': args.categories,
+                'fields': args.fields,
+                'options': args.options,
+                'submissions': args.submissions,
+                'threads': args.threads,
+                'seed': args.seed
+            }
+        },
+        'results': results
+    }
+
+
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    # Regresiones: más latencia, menos throughput o más consultas que la línea base
+    regressions = []
+    for name, current in report['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if previous[metric] and current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append((name, metric, previous[metric], current[metric]))
+        if previous['throughput_rps'] and current['throughput_rps'] < previous['throughput_rps'] * (1 - tolerance):
+            regressions.append((name, 'throughput_rps', previous['throughput_rps'], current['throughput_rps']))
+        if round(current['queries_per_request'], 1) > round(previous['queries_per_request'], 1):
+            regressions.append((name, 'queries_per_request', previous['queries_per_request'], current['queries_per_request']))
+    return regressions
+
+
+def param_differences(report, baseline):
+    # Comparar corridas con otra semilla o tamaño no tiene sentido
+    current = report['meta']['params']
+    previous = baseline.get('meta', {}).get('params', {})
+    return [
+        (key, previous.get(key), current.get(key))
+        for key in sorted(set(current) | set(previous))
+        if previous.get(key) != current.get(key)
+    ]
+
+
+def print_report(report):
+    print(f"{'endpoint':<36} {'reqs':>6} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'q/req':>6}")
+    for name, r in report['results'].items():
+        print(
+            f"{name:<36} {r['requests']:>6} {r['throughput_rps']:>9.1f} {r['p50_ms']:>8.2f} "
+            f"{r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['queries_per_request']:>6.1f}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Endpoint benchmark against a local SQLite database')
+    parser.add_argument('--database-uri', default=None, help='Default: temporary SQLite file')
+    parser.add_argument(
+        '--reset-database', action='store_true',
+        help='Required for non-SQLite URIs: every table in that database is dropped'
+    )
+    parser.add_argument('--categories', type=int, default=10)
+    parser.add_argument('--fields', type=int, default=8)
+    parser.add_argument('--options', type=int, default=5)
+    parser.add_argument('--submissions', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--compare', help='Baseline JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    # run() borra y recrea todas las tablas de la base indicada
+    if args.database_uri and not args.database_uri.startswith('sqlite') and not args.reset_database:
+        parser.error(
+            f"refusing to drop all tables in {args.database_uri.split(':', 1)[0]} database; "
+            'pass --reset-database if that is intended'
+        )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.database_uri is None:
+            args.database_uri = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        report = run(args)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        differences = param_differences(report, baseline)
+        if differences:
+            for key, before, after in differences:
+                print(f'PARAMS DIFFER {key}: baseline {before}, this run {after}')
+            print('Not comparing: rerun with the baseline parameters')
+            return 2
+        regressions = compare(report, baseline, args.tolerance)
+        for name, metric, before, after in regressions:
+            print(f'REGRESSION {name} {metric}: {before} -> {after}')
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import sys
+import click
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.schema import CreateColumn
+from extensions import db
+import models.models  # noqa: F401  registra las tablas en db.metadata
+from services import archive
+from services import rollups
+from services import search_index
+
+
+def create_tables():
+    # Crea las tablas que falten y agrega columnas e índices nuevos a las
+    # tablas existentes (create_all no los toca)
+    db.create_all()
+    created = []
+    with db.engine.begin() as conn:
+        inspector = db.inspect(conn)
+        for table in db.metadata.sorted_tables:
+            columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in columns:
+                    spec = CreateColumn(column).compile(dialect=conn.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {spec}'))
+                    created.append(f'{table.name}.{column.name}')
+
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(conn)
+                    created.append(index.name)
+    return created
+
+
+def register_commands(app):
+
+    @app.cli.command('create-tables')
+    def create_tables_command():
+        created = create_tables()
+        click.echo(f'Tables up to date, {len(created)} columns/indexes created')
+        for name in created:
+            click.echo(f'  {name}')
+
+    @app.cli.command('rebuild-search-index')
+    @click.option('--category-id', type=int, default=None, help='Solo esta categoría')
+    @click.option('--batch-size', type=int, default=search_index.SCAN_CHUNK_SIZE)
+    def rebuild_search_index(category_id, batch_size):
+        indexed = search_index.rebuild(category_id=category_id, batch_size=batch_size)
+        click.echo(f'Indexed {indexed} values')
+
+    @app.cli.command('rebuild-rollups')
+    @click.option('--category-id', type=int, default=None, help='Solo esta categoría')
+    def rebuild_rollups(category_id):
+        days, values = rollups.rebuild(category_id=category_id)
+        click.echo(f'Rebuilt {days} daily buckets and {values} value buckets')
+
+    @app.cli.command('check-rollups')
+    @click.option('--category-id', type=int, default=None, help='Solo esta categoría')
+    def check_rollups(category_id):
+        mismatches = rollups.check(category_id=category_id)
+        for mismatch in mismatches:
+            click.echo(mismatch)
+        click.echo(f'{len(mismatches)} mismatches')
+        if mismatches:
+            sys.exit(1)
+
+    @app.cli.command('archive-submissions')
+    @click.option('--older-than-days', type=int, default=None, help='Default: ARCHIVE_AFTER_DAYS')
+    @click.option('--include-inactive/--skip-inactive', default=True)
+    @click.option('--batch-size', type=int, default=None, help='Default: ARCHIVE_BATCH_SIZE')
+    @click.option('--max-batches', type=int, default=None)
+    @click.option('--pause', type=float, default=None, help='Segundos entre lotes')
+    def archive_submissions(older_than_days, include_inactive, batch_size, max_batches, pause):
+        config = current_app.config
+        days = older_than_days if older_than_days is not None else config['ARCHIVE_AFTER_DAYS']
+        archived = archive.run_locked(
+            archive.cutoff_for(days),
+            include_inactive=include_inactive,
+            batch_size=batch_size or config['ARCHIVE_BATCH_SIZE'],
+            max_batches=max_batches,
+            pause=pause if pause is not None else config['ARCHIVE_BATCH_PAUSE']
+        )
+        if archived is None:
+            click.echo('Another process is archiving, nothing done')
+            sys.exit(1)
+        click.echo(f'Archived {archived} submissions')
+
+    @app.cli.command('archive-scheduler')
+    @click.option('--interval-hours', type=float, default=None, help='Default: ARCHIVE_INTERVAL_HOURS')
+    def archive_scheduler(interval_hours):
+        # Proceso dedicado; alternativa a programar archive-submissions con cron
+        interval = interval_hours or current_app.config['ARCHIVE_INTERVAL_HOURS']
+        click.echo(f'Archiving every {interval} hours')
+        archive.run_forever(current_app._get_current_object(), interval)
@@ -0,0 +1,61 @@
+import os
+
+
+def env_bool(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class Config:
+    SQLALCHEMY_DATABASE_URI = os.environ.get(
+        'DATABASE_URL', 'mysql+pymysql://root:@localhost/warehouse_personal'
+    )
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Pool de conexiones
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 280))
+    DB_POOL_PRE_PING = env_bool('DB_POOL_PRE_PING', True)
+
+    # SQLite (desarrollo y benchmarks)
+    SQLITE_WAL = env_bool('SQLITE_WAL', True)
+    SQLITE_FOREIGN_KEYS = env_bool('SQLITE_FOREIGN_KEYS', True)
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 30))
+
+    SCHEMA_CACHE_CHECK_SECONDS = float(os.environ.get('SCHEMA_CACHE_CHECK_SECONDS', 5))
+    BULK_INSERT_BATCH_SIZE = int(os.environ.get('BULK_INSERT_BATCH_SIZE', 500))
+    IMAGE_VARIANT_WORKERS = int(os.environ.get('IMAGE_VARIANT_WORKERS', 2))
+    IMAGE_VARIANT_QUEUE_SIZE = int(os.environ.get('IMAGE_VARIANT_QUEUE_SIZE', 100))
+    SQL_INSTRUMENTATION = env_bool('SQL_INSTRUMENTATION', False)
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 5))
+
+    # Archivo de submissions antiguas o inactivas
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 365))
+    ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 500))
+    ARCHIVE_BATCH_PAUSE = float(os.environ.get('ARCHIVE_BATCH_PAUSE', 0.1))
+    ARCHIVE_INTERVAL_HOURS = float(os.environ.get('ARCHIVE_INTERVAL_HOURS', 24))
+
+
+def engine_options(config):
+    # Opciones de create_engine según el backend configurado
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    options = {
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_recycle': config['DB_POOL_RECYCLE']
+    }
+
+    if uri.startswith('sqlite'):
+        options['connect_args'] = {
+            'timeout': config['SQLITE_BUSY_TIMEOUT'],
+            'check_same_thread': False
+        }
+        # Las bases en memoria usan un pool de una sola conexión
+        if uri in ('sqlite://', 'sqlite:///:memory:'):
+            return options
+
+    options['pool_size'] = config['DB_POOL_SIZE']
+    options['max_overflow'] = config['DB_MAX_OVERFLOW']
+    return options
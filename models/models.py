@@ -11,6 +11,7 @@ class Category(db.Model):
     description = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     active = db.Column(db.SmallInteger, default=1)
+    schema_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     fields = db.relationship('CategoryField', backref='category', lazy=True)
     
@@ -71,12 +72,21 @@ class FieldOption(db.Model):
 
 class FormSubmission(db.Model):
     __tablename__ = 'form_submissions'
+    __table_args__ = (
+        db.Index('ix_form_submissions_category_created', 'category_id', 'created_at', 'id'),
+        db.Index('ix_form_submissions_ingest_key', 'ingest_key'),
+        # Sin AUTOINCREMENT, SQLite reutiliza el id más alto al borrarlo y
+        # chocaría con los ids que conserva form_submissions_archive
+        {'sqlite_autoincrement': True},
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     active = db.Column(db.SmallInteger, default=1)
+    # "<lote>:<posición>" en las cargas masivas, para recuperar los ids sin RETURNING
+    ingest_key = db.Column(db.String(48), nullable=True)
     
     category = db.relationship('Category', backref='submissions')
     values = db.relationship('FormValue', backref='submission', lazy=True)
@@ -95,6 +105,10 @@ class FormSubmission(db.Model):
 
 class FormValue(db.Model):
     __tablename__ = 'form_values'
+    __table_args__ = (
+        db.Index('ix_form_values_submission', 'submission_id', 'field_id'),
+        {'sqlite_autoincrement': True},
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     submission_id = db.Column(db.Integer, db.ForeignKey('form_submissions.id'), nullable=False)
@@ -110,4 +124,76 @@ class FormValue(db.Model):
             'field_name': self.field.name,
             'field_type': self.field.field_type,
             'value': self.value
-        }
\ No newline at end of file
+        }
+
+
+class FormValueIndex(db.Model):
+    __tablename__ = 'form_value_index'
+    __table_args__ = (
+        db.Index('ix_form_value_index_text', 'field_id', 'value_text', 'submission_id'),
+        db.Index('ix_form_value_index_number', 'field_id', 'value_number', 'submission_id'),
+        db.Index('ix_form_value_index_date', 'field_id', 'value_date', 'submission_id'),
+        # Una entrada por respuesta; también sirve para probar por submission
+        db.Index('uq_form_value_index_submission_field', 'submission_id', 'field_id', unique=True),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    submission_id = db.Column(db.Integer, db.ForeignKey('form_submissions.id'), nullable=False)
+    field_id = db.Column(db.Integer, db.ForeignKey('category_fields.id'), nullable=False)
+    value_text = db.Column(db.String(191), nullable=True)
+    value_number = db.Column(db.Double, nullable=True)
+    value_date = db.Column(db.DateTime, nullable=True)
+
+
+class CategoryDailyCount(db.Model):
+    __tablename__ = 'category_daily_counts'
+    
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat() if self.day else None,
+            'count': self.count
+        }
+
+
+class FieldValueCount(db.Model):
+    __tablename__ = 'field_value_counts'
+    
+    field_id = db.Column(db.Integer, db.ForeignKey('category_fields.id'), primary_key=True)
+    value = db.Column(db.String(191), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'value': self.value,
+            'count': self.count
+        }
+
+
+class ArchivedFormSubmission(db.Model):
+    __tablename__ = 'form_submissions_archive'
+    __table_args__ = (
+        db.Index('ix_form_submissions_archive_category_created', 'category_id', 'created_at', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    active = db.Column(db.SmallInteger, default=1)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class ArchivedFormValue(db.Model):
+    __tablename__ = 'form_values_archive'
+    __table_args__ = (
+        db.Index('ix_form_values_archive_submission', 'submission_id', 'field_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    submission_id = db.Column(db.Integer, db.ForeignKey('form_submissions_archive.id'), nullable=False)
+    field_id = db.Column(db.Integer, db.ForeignKey('category_fields.id'), nullable=False)
+    value = db.Column(db.Text, nullable=True)
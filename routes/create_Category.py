@@ -1,9 +1,11 @@
 from flask import Blueprint, jsonify, request, send_from_directory, current_app
 from models.models import *
 from extensions import db
+from services.schema_cache import schema_cache, bump_schema_version, category_to_dict, field_to_dict
+from services import rollups
 from werkzeug.utils import secure_filename
 import os
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 import json
 
@@ -40,9 +42,22 @@ def create_fields_bulk():
         db.session.add(field)
         fields.append(field)
     
+    category_ids = {f.category_id for f in fields}
+    bump_schema_version(category_ids)
+    db.session.flush()
+    created = [(f.category_id, f.id) for f in fields]
     db.session.commit()
     
-    return jsonify([f.to_dict() for f in fields]), 201
+    for category_id in category_ids:
+        schema_cache.invalidate(category_id)
+    
+    # Respuesta desde el esquema recién compilado (una consulta por categoría)
+    # en vez de recargar cada campo y sus opciones
+    schemas = {category_id: schema_cache.get(category_id) for category_id in category_ids}
+    return jsonify([
+        field_to_dict(schemas[category_id]['fields_by_id'][field_id])
+        for category_id, field_id in created
+    ]), 201
 
 @categories_bp.route('/field-options', methods=['POST'])
 def create_field_options():
@@ -58,6 +73,48 @@ def create_field_options():
         db.session.add(option)
         options.append(option)
     
+    category_ids = set()
+    field_ids = {opt.field_id for opt in options}
+    if field_ids:
+        category_ids = {
+            category_id for (category_id,) in
+            db.session.query(CategoryField.category_id).filter(CategoryField.id.in_(field_ids)).distinct()
+        }
+    bump_schema_version(category_ids)
+    db.session.flush()
+    data = [opt.to_dict() for opt in options]
     db.session.commit()
     
-    return jsonify([opt.to_dict() for opt in options]), 201
\ No newline at end of file
+    for category_id in category_ids:
+        schema_cache.invalidate(category_id)
+    
+    return jsonify(data), 201
+
+
+@categories_bp.route('/categories/<int:category_id>', methods=['GET'])
+def get_category(category_id):
+    schema = schema_cache.get(category_id)
+    if schema is None:
+        return jsonify({'error': 'Category not found'}), 404
+    
+    return jsonify(category_to_dict(schema)), 200
+
+
+@categories_bp.route('/schema-cache/stats', methods=['GET'])
+def schema_cache_stats():
+    return jsonify(schema_cache.stats()), 200
+
+
+@categories_bp.route('/categories/<int:category_id>/stats', methods=['GET'])
+def category_stats(category_id):
+    schema = schema_cache.get(category_id)
+    if schema is None:
+        return jsonify({'error': 'Category not found'}), 404
+    
+    try:
+        start = date.fromisoformat(request.args['from']) if request.args.get('from') else None
+        end = date.fromisoformat(request.args['to']) if request.args.get('to') else None
+    except ValueError:
+        return jsonify({'error': 'from/to must be YYYY-MM-DD dates'}), 400
+    
+    return jsonify(rollups.category_stats(schema, start=start, end=end)), 200
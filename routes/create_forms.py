@@ -1,70 +1,229 @@
-from flask import Blueprint, request, jsonify
-from models.models import FormSubmission, FormValue, CategoryField
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from models.models import FormSubmission, FormValue
 from extensions import db
-import os
-import uuid
+from services.schema_cache import schema_cache
+from services import bulk_ingest
+from services import submissions as submission_queries
+from services import search_index
+from services import image_storage
+from services import rollups
+from services import export as submission_export
+from services import archive
+import json
 
 
 forms_bp = Blueprint('forms', __name__)
 
-UPLOAD_FOLDER = 'static/uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 
 
+def is_truthy(value):
+    return (value or '').lower() in ('1', 'true', 'yes')
+
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
 def save_image(file):
     if file and allowed_file(file.filename):
-        # Genera nombre único para evitar duplicados
+        # El nombre es el hash del contenido: imágenes repetidas se guardan una vez
         ext = file.filename.rsplit('.', 1)[1].lower()
-        filename = f"{uuid.uuid4().hex}.{ext}"
-        
-        # Crea la carpeta si no existe
-        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-        
-        # Guarda el archivo
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(filepath)
         
         # Retorna la URL
-        return f"/static/uploads/{filename}"
+        return image_storage.store(file, ext)
     return None
 
 
 @forms_bp.route('/submissions', methods=['POST'])
 def create_submission():
     # Obtener category_id del form
-    category_id = request.form.get('category_id')
-    
-    # Crear el submission
-    submission = FormSubmission(category_id=category_id)
-    db.session.add(submission)
-    db.session.flush()
+    category_id = request.form.get('category_id', type=int)
     
-    # Obtener los campos de esta categoría
-    fields = CategoryField.query.filter_by(category_id=category_id).all()
+    # Esquema compilado de la categoría (sin consultas si está en caché)
+    schema = schema_cache.get(category_id) if category_id is not None else None
+    if schema is None:
+        return jsonify({'error': 'Category not found'}), 404
     
-    for field in fields:
+    # Primero se leen los valores y se guardan las imágenes, así la
+    # transacción no queda abierta mientras se escriben archivos
+    field_values = []
+    for field in schema['fields']:
         value = None
         
-        if field.field_type == 'image':
+        if field['field_type'] == 'image':
             # Buscar archivo con el nombre del campo
-            file = request.files.get(f'field_{field.id}')
+            file = request.files.get(f"field_{field['id']}")
             if file:
                 value = save_image(file)
         else:
             # Campos normales (text, number, date, etc.)
-            value = request.form.get(f'field_{field.id}')
-        
+            value = request.form.get(f"field_{field['id']}")
+        field_values.append((field, value))
+    
+    # Crear el submission
+    submission = FormSubmission(category_id=category_id)
+    db.session.add(submission)
+    db.session.flush()
+    
+    form_values = []
+    for field, value in field_values:
         form_value = FormValue(
             submission_id=submission.id,
-            field_id=field.id,
+            field_id=field['id'],
             value=value
         )
         db.session.add(form_value)
+        form_values.append((form_value, field))
+    
+    db.session.flush()
+    
+    # Índice tipado para búsquedas, en la misma transacción
+    search_index.index_rows(
+        search_index.typed_row(submission.id, field['id'], field['field_type'], form_value.value)
+        for form_value, field in form_values
+    )
+    
+    # Rollups de reportes, también en la misma transacción
+    rollups.record_submission(category_id, submission.created_at, [
+        (field['id'], field['field_type'], form_value.value)
+        for form_value, field in form_values
+    ])
+    
+    # Se arma la respuesta con el esquema para no recargar cada FormValue.field
+    data = submission.to_dict()
+    data['values'] = [
+        {
+            'id': form_value.id,
+            'field_id': field['id'],
+            'field_name': field['name'],
+            'field_type': field['field_type'],
+            'value': form_value.value
+        }
+        for form_value, field in form_values
+    ]
     
     db.session.commit()
     
-    return jsonify(submission.to_dict(include_values=True)), 201
\ No newline at end of file
+    return jsonify(data), 201
+
+
+@forms_bp.route('/submissions/bulk', methods=['POST'])
+def create_submissions_bulk():
+    # Cuerpo NDJSON: una línea por submission
+    # {"category_id": 1, "created_at": "2024-01-31T10:00:00", "values": {"<field_id>": "..."}}
+    batch_size = request.args.get(
+        'batch_size',
+        current_app.config.get('BULK_INSERT_BATCH_SIZE', bulk_ingest.DEFAULT_BATCH_SIZE),
+        type=int
+    )
+    batch_size = max(1, min(batch_size, bulk_ingest.MAX_BATCH_SIZE))
+    stream = request.stream
+    
+    def generate():
+        for result in bulk_ingest.ingest(stream, batch_size=batch_size):
+            yield json.dumps(result) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@forms_bp.route('/categories/<int:category_id>/submissions', methods=['GET'])
+def list_submissions(category_id):
+    schema = schema_cache.get(category_id)
+    if schema is None:
+        return jsonify({'error': 'Category not found'}), 404
+    
+    limit = request.args.get('limit', submission_queries.DEFAULT_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, submission_queries.MAX_PAGE_SIZE))
+    
+    try:
+        start = submission_queries.parse_datetime(request.args['from']) if request.args.get('from') else None
+        end = submission_queries.parse_datetime(request.args['to']) if request.args.get('to') else None
+    except ValueError:
+        return jsonify({'error': 'from/to must be ISO 8601 dates'}), 400
+    
+    # Los rangos históricos incluyen el archivo sin que el cliente lo pida
+    include_archived = is_truthy(request.args.get('include_archived')) or archive.needs_archive(
+        category_id, start, end
+    )
+    
+    try:
+        rows, next_cursor = submission_queries.fetch_page(
+            category_id, cursor=request.args.get('cursor'), limit=limit,
+            start=start, end=end, include_archived=include_archived
+        )
+    except submission_queries.InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    values = submission_queries.fetch_values(rows)
+    fields_by_id = schema['fields_by_id']
+    
+    # La página se serializa por partes en lugar de armar un solo string
+    def generate():
+        yield '{"items": ['
+        for i, row in enumerate(rows):
+            item = submission_queries.submission_to_dict(row, values, fields_by_id)
+            yield (',' if i else '') + json.dumps(item)
+        yield '], "next_cursor": ' + json.dumps(next_cursor) + '}'
+    
+    return Response(generate(), mimetype='application/json')
+
+
+@forms_bp.route('/categories/<int:category_id>/search', methods=['POST'])
+def search_submissions(category_id):
+    # {"filters": [{"field_id": 1, "op": "eq", "value": "red"},
+    #              {"field_id": 2, "op": "gt", "value": 10}], "limit": 50, "cursor": null}
+    schema = schema_cache.get(category_id)
+    if schema is None:
+        return jsonify({'error': 'Category not found'}), 404
+    
+    data = request.get_json() or {}
+    limit = data.get('limit', search_index.DEFAULT_LIMIT)
+    try:
+        limit = max(1, min(int(limit), search_index.MAX_LIMIT))
+        after = int(data['cursor']) if data.get('cursor') is not None else None
+        filters = [search_index.compile_filter(item, schema['fields_by_id']) for item in data.get('filters', [])]
+        submission_ids, next_cursor = search_index.search(filters, after=after, limit=limit)
+    except search_index.InvalidFilter as e:
+        return jsonify({'error': str(e)}), 400
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid limit or cursor'}), 400
+    
+    rows = submission_queries.fetch_by_ids(submission_ids)
+    values = submission_queries.fetch_values(rows)
+    items = [
+        submission_queries.submission_to_dict(row, values, schema['fields_by_id'])
+        for row in rows
+    ]
+    
+    return jsonify({'items': items, 'next_cursor': next_cursor}), 200
+
+
+@forms_bp.route('/categories/<int:category_id>/export', methods=['GET'])
+def export_submissions(category_id):
+    schema = schema_cache.get(category_id)
+    if schema is None:
+        return jsonify({'error': 'Category not found'}), 404
+    
+    fmt = request.args.get('format', 'csv')
+    if fmt not in submission_export.FORMATS:
+        return jsonify({'error': 'format must be csv or jsonl'}), 400
+    compress = is_truthy(request.args.get('gzip'))
+    # Los auditores esperan todas las submissions: el archivo se incluye
+    # salvo que se pida include_archived=0
+    include_archived = is_truthy(request.args.get('include_archived', '1'))
+    
+    filename = f'category_{category_id}_submissions.{fmt}'
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    if compress:
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    
+    chunks = submission_export.export(
+        category_id, schema['fields'], fmt, compress=compress, include_archived=include_archived
+    )
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
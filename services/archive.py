@@ -0,0 +1,140 @@
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import delete, insert, literal, or_, select, text
+from extensions import db
+from models.models import (
+    ArchivedFormSubmission, ArchivedFormValue, FormSubmission, FormValue, FormValueIndex
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AFTER_DAYS = 365
+DEFAULT_BATCH_SIZE = 500
+LOCK_NAME = 'warehouse_archive_submissions'
+
+
+def cutoff_for(days):
+    return datetime.utcnow() - timedelta(days=days)
+
+
+def archive_batch(ids):
+    # Copia y borra un lote en una transacción corta
+    now = datetime.utcnow()
+    submissions = FormSubmission.__table__
+    values = FormValue.__table__
+
+    db.session.execute(insert(ArchivedFormSubmission.__table__).from_select(
+        ['id', 'category_id', 'created_at', 'updated_at', 'active', 'archived_at'],
+        select(
+            submissions.c.id, submissions.c.category_id, submissions.c.created_at,
+            submissions.c.updated_at, submissions.c.active, literal(now)
+        ).where(submissions.c.id.in_(ids))
+    ))
+    db.session.execute(insert(ArchivedFormValue.__table__).from_select(
+        ['id', 'submission_id', 'field_id', 'value'],
+        select(values.c.id, values.c.submission_id, values.c.field_id, values.c.value)
+        .where(values.c.submission_id.in_(ids))
+    ))
+
+    # El índice de búsqueda solo cubre las submissions vivas
+    db.session.execute(delete(FormValueIndex.__table__).where(FormValueIndex.submission_id.in_(ids)))
+    db.session.execute(delete(values).where(values.c.submission_id.in_(ids)))
+    db.session.execute(delete(submissions).where(submissions.c.id.in_(ids)))
+    db.session.commit()
+
+
+def archive(cutoff, include_inactive=True, batch_size=DEFAULT_BATCH_SIZE, max_batches=None, pause=0):
+    # Mueve al archivo las submissions anteriores a cutoff (y las inactivas)
+    # recorriendo la tabla por id, un lote a la vez
+    condition = FormSubmission.created_at < cutoff
+    if include_inactive:
+        condition = or_(condition, FormSubmission.active == 0)
+
+    archived = 0
+    batches = 0
+    last_id = 0
+    while max_batches is None or batches < max_batches:
+        ids = [
+            row.id for row in
+            db.session.query(FormSubmission.id)
+            .filter(FormSubmission.id > last_id, condition)
+            .order_by(FormSubmission.id)
+            .limit(batch_size)
+        ]
+        if not ids:
+            break
+
+        try:
+            archive_batch(ids)
+        except Exception:
+            db.session.rollback()
+            raise
+        archived += len(ids)
+        batches += 1
+        last_id = ids[-1]
+        if pause:
+            time.sleep(pause)
+
+    return archived
+
+
+def needs_archive(category_id, start, end):
+    # Solo los rangos con filas realmente archivadas leen del archivo, sin
+    # importar con qué corte se archivó (índice category_id, created_at)
+    if start is None and end is None:
+        return False
+    query = db.session.query(ArchivedFormSubmission.id).filter(
+        ArchivedFormSubmission.category_id == category_id
+    )
+    if start is not None:
+        query = query.filter(ArchivedFormSubmission.created_at >= start)
+    if end is not None:
+        query = query.filter(ArchivedFormSubmission.created_at < end)
+    return query.first() is not None
+
+
+@contextmanager
+def archive_lock():
+    # Un solo archivador a la vez entre procesos: GET_LOCK en MySQL.
+    # Devuelve False si otro proceso ya tiene el lock.
+    if db.engine.dialect.name != 'mysql':
+        yield True
+        return
+
+    with db.engine.connect() as conn:
+        acquired = conn.execute(text('SELECT GET_LOCK(:name, 0)'), {'name': LOCK_NAME}).scalar() == 1
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                conn.execute(text('SELECT RELEASE_LOCK(:name)'), {'name': LOCK_NAME})
+
+
+def run_locked(cutoff, **kwargs):
+    # archive() protegido por el lock; None si otro proceso está archivando
+    with archive_lock() as acquired:
+        if not acquired:
+            logger.info('Another process holds the archive lock, skipping run')
+            return None
+        return archive(cutoff, **kwargs)
+
+
+def run_forever(app, interval_hours):
+    # Para un proceso dedicado (flask archive-scheduler), no para los workers web
+    while True:
+        with app.app_context():
+            try:
+                archived = run_locked(
+                    cutoff_for(app.config['ARCHIVE_AFTER_DAYS']),
+                    batch_size=app.config['ARCHIVE_BATCH_SIZE'],
+                    pause=app.config['ARCHIVE_BATCH_PAUSE']
+                )
+                if archived is not None:
+                    logger.info('Archived %d submissions', archived)
+            except Exception:
+                logger.exception('Scheduled archive failed')
+            finally:
+                db.session.remove()
+        time.sleep(interval_hours * 3600)
@@ -0,0 +1,185 @@
+import json
+import uuid
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import insert
+from extensions import db
+from models.models import FormSubmission, FormValue
+from services.schema_cache import schema_cache
+from services import search_index
+from services import rollups
+from services.submissions import parse_datetime
+
+DEFAULT_BATCH_SIZE = 500
+MAX_BATCH_SIZE = 5000
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def iter_lines(stream, chunk_size=READ_CHUNK_SIZE):
+    # Lee el cuerpo por bloques y entrega una línea a la vez (numeradas desde 1)
+    buffer = b''
+    line_no = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for raw in lines:
+            line_no += 1
+            yield line_no, raw
+    if buffer:
+        yield line_no + 1, buffer
+
+
+def parse_line(line_no, raw):
+    # Devuelve (fila lista para insertar, None) o (None, mensaje de error)
+    try:
+        item = json.loads(raw)
+    except ValueError as e:
+        return None, f'Invalid JSON: {e}'
+    if not isinstance(item, dict):
+        return None, 'Expected a JSON object'
+
+    try:
+        category_id = int(item.get('category_id'))
+    except (TypeError, ValueError):
+        return None, 'category_id is required'
+
+    schema = schema_cache.get(category_id)
+    if schema is None:
+        return None, 'Category not found'
+
+    created_at = datetime.utcnow()
+    if item.get('created_at'):
+        try:
+            created_at = parse_datetime(item['created_at'])
+        except (TypeError, ValueError):
+            return None, 'created_at must be an ISO 8601 datetime'
+
+    values = item.get('values') or {}
+    if not isinstance(values, dict):
+        return None, 'values must be an object'
+
+    # Igual que create_submission: un FormValue por cada campo de la categoría
+    field_values = []
+    for field in schema['fields']:
+        value = values.get(str(field['id']), values.get(f"field_{field['id']}"))
+        if value is not None and not isinstance(value, str):
+            value = str(value)
+        field_values.append((field['id'], field['field_type'], value))
+
+    return {
+        'line': line_no,
+        'category_id': category_id,
+        'created_at': created_at,
+        'values': field_values
+    }, None
+
+
+def _insert_submissions(rows):
+    table = FormSubmission.__table__
+    dialect = db.session.get_bind().dialect
+
+    if dialect.insert_executemany_returning_sort_by_parameter_order:
+        result = db.session.execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True),
+            [_submission_params(row) for row in rows]
+        )
+        return result.scalars().all()
+
+    # Sin RETURNING (MySQL) no se puede suponer que los ids del lote son
+    # consecutivos (auto_increment_increment > 1, innodb_autoinc_lock_mode=2).
+    # Cada fila lleva una clave "<lote>:<posición>" y los ids se leen de
+    # vuelta con una sola consulta sobre ix_form_submissions_ingest_key.
+    batch = uuid.uuid4().hex
+    params = [
+        dict(_submission_params(row), ingest_key=f'{batch}:{position}')
+        for position, row in enumerate(rows)
+    ]
+    db.session.execute(insert(table).values(params))
+
+    ids = [None] * len(rows)
+    keyed = db.session.query(FormSubmission.id, FormSubmission.ingest_key).filter(
+        # Rango en vez de LIKE: ';' es el carácter siguiente a ':'
+        FormSubmission.ingest_key >= f'{batch}:',
+        FormSubmission.ingest_key < f'{batch};'
+    )
+    for submission_id, ingest_key in keyed:
+        ids[int(ingest_key.rsplit(':', 1)[1])] = submission_id
+    return ids
+
+
+def _submission_params(row):
+    return {
+        'category_id': row['category_id'],
+        'created_at': row['created_at'],
+        'updated_at': row['created_at'],
+        'active': 1
+    }
+
+
+def insert_batch(rows):
+    submission_ids = _insert_submissions(rows)
+
+    value_params = [
+        {'submission_id': submission_id, 'field_id': field_id, 'value': value}
+        for row, submission_id in zip(rows, submission_ids)
+        for field_id, _, value in row['values']
+    ]
+    if value_params:
+        db.session.execute(insert(FormValue.__table__), value_params)
+
+    search_index.index_rows(
+        search_index.typed_row(submission_id, field_id, field_type, value)
+        for row, submission_id in zip(rows, submission_ids)
+        for field_id, field_type, value in row['values']
+    )
+
+    daily, values = Counter(), Counter()
+    for row in rows:
+        row_daily, row_values = rollups.submission_deltas(row['category_id'], row['created_at'], row['values'])
+        daily.update(row_daily)
+        values.update(row_values)
+    rollups.apply_deltas(daily, values)
+
+    db.session.commit()
+    return submission_ids
+
+
+def ingest(stream, batch_size=DEFAULT_BATCH_SIZE):
+    # Generador de resultados por línea; nunca guarda más de un lote en memoria
+    summary = {'lines': 0, 'inserted': 0, 'errors': 0}
+    batch = []
+
+    def flush():
+        try:
+            ids = insert_batch(batch)
+        except Exception as e:
+            db.session.rollback()
+            summary['errors'] += len(batch)
+            results = [{'line': row['line'], 'ok': False, 'error': f'Database error: {e.__class__.__name__}'} for row in batch]
+        else:
+            summary['inserted'] += len(batch)
+            results = [{'line': row['line'], 'ok': True, 'submission_id': i} for row, i in zip(batch, ids)]
+        batch.clear()
+        return results
+
+    for line_no, raw in iter_lines(stream):
+        if not raw.strip():
+            continue
+        summary['lines'] += 1
+        row, error = parse_line(line_no, raw)
+        if error:
+            summary['errors'] += 1
+            yield {'line': line_no, 'ok': False, 'error': error}
+            continue
+
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield from flush()
+
+    if batch:
+        yield from flush()
+
+    yield {'summary': summary}
@@ -0,0 +1,109 @@
+import csv
+import io
+import json
+import zlib
+from sqlalchemy import select
+from extensions import db
+from models.models import ArchivedFormSubmission, ArchivedFormValue, FormSubmission, FormValue
+
+YIELD_PER = 1000
+FLUSH_SIZE = 64 * 1024
+FORMATS = {'csv', 'jsonl'}
+
+
+def column_names(fields):
+    # Nombres de columna únicos, en el orden de los campos de la categoría
+    names = []
+    seen = set()
+    for field in fields:
+        name = field['name']
+        if name in seen or name in ('submission_id', 'created_at'):
+            name = f"{name} ({field['id']})"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def iter_rows(category_id, fields, include_archived=True):
+    # Un registro por submission, pivotando form_values sobre la marcha.
+    # yield_per activa un cursor del lado del servidor (stream_results).
+    positions = {field['id']: i for i, field in enumerate(fields)}
+    query = (
+        select(FormSubmission.id, FormSubmission.created_at, FormValue.field_id, FormValue.value)
+        .outerjoin(FormValue, FormValue.submission_id == FormSubmission.id)
+        .where(FormSubmission.category_id == category_id)
+    )
+    if include_archived:
+        query = query.union_all(
+            select(
+                ArchivedFormSubmission.id, ArchivedFormSubmission.created_at,
+                ArchivedFormValue.field_id, ArchivedFormValue.value
+            )
+            .outerjoin(ArchivedFormValue, ArchivedFormValue.submission_id == ArchivedFormSubmission.id)
+            .where(ArchivedFormSubmission.category_id == category_id)
+        )
+        query = select(query.subquery())
+    query = query.order_by(query.selected_columns[0]).execution_options(yield_per=YIELD_PER)
+
+    result = db.session.execute(query)
+    try:
+        current_id = None
+        current = None
+        for submission_id, created_at, field_id, value in result:
+            if submission_id != current_id:
+                if current is not None:
+                    yield current
+                current_id = submission_id
+                current = [submission_id, created_at.isoformat() if created_at else None] + [None] * len(fields)
+            position = positions.get(field_id)
+            if position is not None:
+                current[position + 2] = value
+        if current is not None:
+            yield current
+    finally:
+        result.close()
+
+
+def iter_csv(header, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= FLUSH_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_jsonl(header, rows):
+    chunk = []
+    size = 0
+    for row in rows:
+        line = json.dumps(dict(zip(header, row))) + '\n'
+        chunk.append(line)
+        size += len(line)
+        if size >= FLUSH_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield ''.join(chunk)
+
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export(category_id, fields, fmt, compress=False, include_archived=True):
+    header = ['submission_id', 'created_at'] + column_names(fields)
+    rows = iter_rows(category_id, fields, include_archived=include_archived)
+    chunks = iter_csv(header, rows) if fmt == 'csv' else iter_jsonl(header, rows)
+    return gzip_stream(chunks) if compress else chunks
@@ -0,0 +1,146 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image
+except ImportError:  # Sin Pillow no se generan variantes (se avisa al iniciar)
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_FOLDER = 'static/uploads'
+UPLOAD_URL = '/static/uploads'
+CHUNK_SIZE = 64 * 1024
+VARIANTS = {'thumb': (256, 256), 'medium': (1024, 1024)}
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 100
+SNIFF_SIZE = 12
+
+
+def detect_extension(head):
+    # Extensión según los primeros bytes del contenido, no según el nombre
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpg'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+class VariantWorkers:
+    # Pool acotado de hilos para generar variantes fuera del request
+
+    def __init__(self, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+        self._executor = None
+        self._workers = workers
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def configure(self, workers, queue_size):
+        if Image is None:
+            logger.warning('Pillow is not installed: image thumbnails and resized variants are disabled')
+        with self._lock:
+            if self._executor is None:
+                self._workers = workers
+                self._slots = threading.BoundedSemaphore(queue_size)
+
+    def submit(self, fn, *args):
+        # Si la cola está llena se descarta la tarea en vez de bloquear el request
+        if not self._slots.acquire(blocking=False):
+            self.dropped += 1
+            logger.warning('Image variant queue full, skipping %s', args[0] if args else fn)
+            return False
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._workers, thread_name_prefix='image-variants'
+                )
+
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        return True
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+variant_workers = VariantWorkers()
+
+
+def content_path(digest, ext, variant=None):
+    name = f'{digest}_{variant}.{ext}' if variant else f'{digest}.{ext}'
+    return os.path.join(digest[:2], name)
+
+
+def store(file, ext):
+    # Escribe el archivo por bloques mientras calcula su sha256; si el
+    # contenido ya existe se reutiliza el archivo guardado. La extensión sale
+    # del contenido cuando se reconoce, así los mismos bytes subidos como
+    # .jpg y .png se guardan una sola vez.
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    digest = hashlib.sha256()
+    head = b''
+
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_FOLDER, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = file.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if len(head) < SNIFF_SIZE:
+                    head += chunk[:SNIFF_SIZE - len(head)]
+                digest.update(chunk)
+                out.write(chunk)
+
+        ext = detect_extension(head) or ext
+        relative = content_path(digest.hexdigest(), ext)
+        final_path = os.path.join(UPLOAD_FOLDER, relative)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        try:
+            # link() falla si el destino existe: solo la subida que crea el
+            # archivo encola las variantes
+            os.link(tmp_path, final_path)
+            created = True
+        except FileExistsError:
+            created = False
+    finally:
+        os.remove(tmp_path)
+
+    if created and Image is not None:
+        variant_workers.submit(generate_variants, final_path, digest.hexdigest(), ext)
+    return f"{UPLOAD_URL}/{relative.replace(os.sep, '/')}"
+
+
+def generate_variants(path, digest, ext):
+    try:
+        with Image.open(path) as image:
+            for variant, size in VARIANTS.items():
+                target = os.path.join(UPLOAD_FOLDER, content_path(digest, ext, variant))
+                if os.path.exists(target):
+                    continue
+                resized = image.copy()
+                resized.thumbnail(size)
+                # Se escribe a un temporal único para no exponer archivos a medias
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.part')
+                try:
+                    with os.fdopen(fd, 'wb') as out:
+                        resized.save(out, format=image.format)
+                    os.replace(tmp_path, target)
+                except BaseException:
+                    os.remove(tmp_path)
+                    raise
+    except Exception:
+        logger.exception('Could not generate variants for %s', path)
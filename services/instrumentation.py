@@ -0,0 +1,169 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from extensions import db
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 500)
+DEFAULT_N_PLUS_ONE_THRESHOLD = 5
+
+_IN_LIST = re.compile(r'IN \((?:\s*(?:\?|%s|:\w+)\s*,?)+\)|\(__\[POSTCOMPILE_\w+\]\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    # Normaliza la sentencia para agrupar las que solo cambian en parámetros
+    shape = _WHITESPACE.sub(' ', statement).strip()
+    return _IN_LIST.sub('IN (...)', shape)
+
+
+class Histogram:
+
+    def __init__(self, name, help_text, buckets, labels):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label_values, (bucket_counts, count, total) in sorted(self._series.items()):
+                labels = ','.join(f'{k}="{v}"' for k, v in zip(self.labels, label_values))
+                prefix = f'{labels},' if labels else ''
+                for bound, n in zip(self.buckets, bucket_counts):
+                    lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {n}')
+                lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+                lines.append(f'{self.name}_count{{{labels}}} {count}')
+                lines.append(f'{self.name}_sum{{{labels}}} {total}')
+        return lines
+
+
+class SQLInstrumentation:
+    # Cuenta y mide las consultas de cada request a partir de los eventos del engine
+
+    def __init__(self):
+        self.request_latency = Histogram(
+            'http_request_duration_seconds', 'Request latency.',
+            LATENCY_BUCKETS, ('endpoint', 'method', 'status')
+        )
+        self.db_time = Histogram(
+            'db_time_per_request_seconds', 'Total time spent in SQL per request.',
+            LATENCY_BUCKETS, ('endpoint',)
+        )
+        self.query_count = Histogram(
+            'db_queries_per_request', 'Number of SQL statements per request.',
+            QUERY_COUNT_BUCKETS, ('endpoint',)
+        )
+        self.n_plus_one_threshold = DEFAULT_N_PLUS_ONE_THRESHOLD
+
+    def init_app(self, app):
+        if not app.config.get('SQL_INSTRUMENTATION', False):
+            return
+
+        self.n_plus_one_threshold = app.config.get(
+            'SQL_N_PLUS_ONE_THRESHOLD', DEFAULT_N_PLUS_ONE_THRESHOLD
+        )
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+                event.listen(engine, 'handle_error', self._handle_error)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view, methods=['GET'])
+
+    def _before_request(self):
+        g.sql_stats = {
+            'started': time.perf_counter(),
+            'queries': 0,
+            'db_time': 0.0,
+            'slowest': (0.0, None),
+            'shapes': Counter()
+        }
+
+    def _after_request(self, response):
+        stats = g.get('sql_stats')
+        if stats is not None:
+            # Se registra al cerrar la respuesta, así se incluyen las
+            # consultas de las respuestas que se generan por partes
+            endpoint = request.endpoint or 'unknown'
+            method = request.method
+            status = response.status_code
+            response.call_on_close(lambda: self._record(stats, endpoint, method, status))
+        return response
+
+    def _record(self, stats, endpoint, method, status):
+        elapsed = time.perf_counter() - stats['started']
+        self.request_latency.observe(elapsed, endpoint, method, status)
+        self.db_time.observe(stats['db_time'], endpoint)
+        self.query_count.observe(stats['queries'], endpoint)
+
+        slowest_time, slowest_statement = stats['slowest']
+        logger.info(
+            '%s %s: %d queries, %.1f ms in DB, slowest %.1f ms%s',
+            method, endpoint, stats['queries'], stats['db_time'] * 1000,
+            slowest_time * 1000, f': {slowest_statement[:200]}' if slowest_statement else ''
+        )
+        for shape, n in stats['shapes'].items():
+            if n >= self.n_plus_one_threshold:
+                logger.warning(
+                    'Possible N+1 in %s %s: %d executions of %s',
+                    method, endpoint, n, shape[:200]
+                )
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_start'].pop()
+        if not has_request_context():
+            return
+        stats = g.get('sql_stats')
+        if stats is None:
+            return
+
+        duration = time.perf_counter() - started
+        stats['queries'] += 1
+        stats['db_time'] += duration
+        if duration > stats['slowest'][0]:
+            stats['slowest'] = (duration, statement)
+        stats['shapes'][statement_shape(statement)] += 1
+
+    def _handle_error(self, exception_context):
+        # La sentencia falló: after_cursor_execute no se llama
+        conn = exception_context.connection
+        if conn is not None and conn.info.get('query_start'):
+            conn.info['query_start'].pop()
+
+    def render(self):
+        lines = []
+        for histogram in (self.request_latency, self.db_time, self.query_count):
+            lines.extend(histogram.render())
+        return '\n'.join(lines) + '\n'
+
+    def metrics_view(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+
+instrumentation = SQLInstrumentation()
@@ -0,0 +1,207 @@
+from collections import Counter
+from datetime import date
+from sqlalchemy import func, insert, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from extensions import db
+from models.models import (
+    ArchivedFormSubmission, ArchivedFormValue, CategoryDailyCount, CategoryField,
+    FieldValueCount, FormSubmission, FormValue
+)
+
+VALUE_MAX_LENGTH = 191
+HISTOGRAM_TYPES = {'select'}
+
+
+def submission_deltas(category_id, created_at, field_values):
+    # field_values: iterable de (field_id, field_type, value)
+    daily = Counter({(category_id, created_at.date()): 1})
+    values = Counter(
+        (field_id, value[:VALUE_MAX_LENGTH])
+        for field_id, field_type, value in field_values
+        if field_type in HISTOGRAM_TYPES and value
+    )
+    return daily, values
+
+
+def apply_deltas(daily, values):
+    # Se ejecuta dentro de la transacción del insert; no hace commit
+    table = CategoryDailyCount.__table__
+    _increment(table, ('category_id', 'day'), [
+        {'category_id': category_id, 'day': day, 'count': n}
+        for (category_id, day), n in daily.items()
+    ])
+    table = FieldValueCount.__table__
+    _increment(table, ('field_id', 'value'), [
+        {'field_id': field_id, 'value': value, 'count': n}
+        for (field_id, value), n in values.items()
+    ])
+
+
+def record_submission(category_id, created_at, field_values):
+    apply_deltas(*submission_deltas(category_id, created_at, field_values))
+
+
+def _increment(table, keys, rows):
+    if not rows:
+        return
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'mysql':
+        stmt = mysql.insert(table).values(rows)
+        stmt = stmt.on_duplicate_key_update(count=table.c['count'] + stmt.inserted['count'])
+        db.session.execute(stmt)
+    elif dialect in ('sqlite', 'postgresql'):
+        module = sqlite if dialect == 'sqlite' else postgresql
+        stmt = module.insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={'count': table.c['count'] + stmt.excluded['count']}
+        )
+        db.session.execute(stmt)
+    else:
+        for row in rows:
+            condition = [table.c[key] == row[key] for key in keys]
+            result = db.session.execute(
+                update(table).where(*condition).values(count=table.c['count'] + row['count'])
+            )
+            if result.rowcount == 0:
+                db.session.execute(insert(table).values(row))
+
+
+def _as_date(value):
+    # func.date() devuelve texto en SQLite
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def compute(category_id=None):
+    # Agregados calculados desde las tablas base, vivas y archivadas
+    daily = Counter()
+    values = Counter()
+    sources = (
+        (FormSubmission, FormValue),
+        (ArchivedFormSubmission, ArchivedFormValue)
+    )
+
+    for submission_model, value_model in sources:
+        day = func.date(submission_model.created_at)
+        daily_query = db.session.query(
+            submission_model.category_id, day, func.count()
+        ).group_by(submission_model.category_id, day)
+        if category_id is not None:
+            daily_query = daily_query.filter(submission_model.category_id == category_id)
+
+        value = func.substr(value_model.value, 1, VALUE_MAX_LENGTH)
+        values_query = db.session.query(
+            value_model.field_id, value, func.count()
+        ).join(CategoryField, CategoryField.id == value_model.field_id).filter(
+            CategoryField.field_type.in_(HISTOGRAM_TYPES),
+            value_model.value.isnot(None),
+            value_model.value != ''
+        ).group_by(value_model.field_id, value)
+        if category_id is not None:
+            values_query = values_query.filter(CategoryField.category_id == category_id)
+
+        daily.update({(c, _as_date(d)): n for c, d, n in daily_query})
+        values.update({(field_id, v): n for field_id, v, n in values_query})
+    return daily, values
+
+
+def stored(category_id=None):
+    daily_query = db.session.query(CategoryDailyCount)
+    values_query = db.session.query(FieldValueCount)
+    if category_id is not None:
+        daily_query = daily_query.filter(CategoryDailyCount.category_id == category_id)
+        values_query = values_query.join(
+            CategoryField, CategoryField.id == FieldValueCount.field_id
+        ).filter(CategoryField.category_id == category_id)
+
+    daily = Counter({(r.category_id, r.day): r.count for r in daily_query if r.count})
+    values = Counter({(r.field_id, r.value): r.count for r in values_query if r.count})
+    return daily, values
+
+
+def _field_ids(category_id):
+    return db.session.query(CategoryField.id).filter(
+        CategoryField.category_id == category_id
+    ).scalar_subquery()
+
+
+def rebuild(category_id=None):
+    daily_query = CategoryDailyCount.query
+    values_query = FieldValueCount.query
+    if category_id is not None:
+        daily_query = daily_query.filter(CategoryDailyCount.category_id == category_id)
+        values_query = values_query.filter(FieldValueCount.field_id.in_(_field_ids(category_id)))
+    daily_query.delete(synchronize_session=False)
+    values_query.delete(synchronize_session=False)
+
+    daily, values = compute(category_id)
+    apply_deltas(daily, values)
+    db.session.commit()
+    return len(daily), len(values)
+
+
+def check(category_id=None):
+    # Diferencias entre los rollups guardados y lo que dicen las tablas base
+    expected_daily, expected_values = compute(category_id)
+    actual_daily, actual_values = stored(category_id)
+
+    mismatches = []
+    for key in set(expected_daily) | set(actual_daily):
+        if expected_daily[key] != actual_daily[key]:
+            mismatches.append({
+                'table': 'category_daily_counts',
+                'key': [key[0], key[1].isoformat()],
+                'expected': expected_daily[key],
+                'actual': actual_daily[key]
+            })
+    for key in set(expected_values) | set(actual_values):
+        if expected_values[key] != actual_values[key]:
+            mismatches.append({
+                'table': 'field_value_counts',
+                'key': list(key),
+                'expected': expected_values[key],
+                'actual': actual_values[key]
+            })
+    return mismatches
+
+
+def category_stats(schema, start=None, end=None):
+    category_id = schema['category']['id']
+    query = CategoryDailyCount.query.filter(CategoryDailyCount.category_id == category_id)
+    if start is not None:
+        query = query.filter(CategoryDailyCount.day >= start)
+    if end is not None:
+        query = query.filter(CategoryDailyCount.day <= end)
+    daily = [row.to_dict() for row in query.order_by(CategoryDailyCount.day)]
+
+    histogram_fields = [f for f in schema['fields'] if f['field_type'] in HISTOGRAM_TYPES]
+    counts = {}
+    if histogram_fields:
+        rows = FieldValueCount.query.filter(
+            FieldValueCount.field_id.in_([f['id'] for f in histogram_fields])
+        )
+        for row in rows:
+            counts.setdefault(row.field_id, {})[row.value] = row.count
+
+    fields = []
+    for field in histogram_fields:
+        field_counts = counts.get(field['id'], {})
+        # Las opciones sin respuestas aparecen con 0
+        for option in field['options'] or []:
+            field_counts.setdefault(option['value'], 0)
+        fields.append({
+            'field_id': field['id'],
+            'name': field['name'],
+            'histogram': [
+                {'value': value, 'count': n}
+                for value, n in sorted(field_counts.items(), key=lambda item: (-item[1], item[0]))
+            ]
+        })
+
+    return {
+        'category_id': category_id,
+        'total': sum(row['count'] for row in daily),
+        'daily': daily,
+        'fields': fields
+    }
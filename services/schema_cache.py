@@ -0,0 +1,156 @@
+import threading
+import time
+from sqlalchemy import update
+from sqlalchemy.orm import joinedload
+from extensions import db
+from models.models import Category, CategoryField
+
+
+DEFAULT_CHECK_SECONDS = 5
+
+
+class SchemaCache:
+    # Cache en proceso del esquema compilado de cada categoría
+    # (campos, tipos, requeridos y opciones de los select).
+    #
+    # invalidate() solo llega al proceso que hizo el cambio; los demás
+    # workers comparan categories.schema_version con la versión compilada
+    # como mucho cada check_seconds, así que ven los cambios con ese retraso.
+
+    def __init__(self, check_seconds=DEFAULT_CHECK_SECONDS):
+        self._lock = threading.Lock()
+        self._schemas = {}
+        self._checked = {}
+        self._versions = {}
+        self.check_seconds = check_seconds
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.revalidations = 0
+
+    def init_app(self, app):
+        self.check_seconds = app.config.get('SCHEMA_CACHE_CHECK_SECONDS', DEFAULT_CHECK_SECONDS)
+
+    def get(self, category_id):
+        category_id = int(category_id)
+
+        with self._lock:
+            schema = self._schemas.get(category_id)
+            fresh = schema is not None and (
+                time.monotonic() - self._checked[category_id] < self.check_seconds
+            )
+            if fresh:
+                self.hits += 1
+                return schema
+
+        if schema is not None:
+            # Consulta por clave primaria: ¿cambió el esquema en otro proceso?
+            current = db.session.query(Category.schema_version).filter_by(id=category_id).scalar()
+            with self._lock:
+                if current == schema['schema_version'] and self._schemas.get(category_id) is schema:
+                    self._checked[category_id] = time.monotonic()
+                    self.hits += 1
+                    self.revalidations += 1
+                    return schema
+                self._schemas.pop(category_id, None)
+
+        with self._lock:
+            self.misses += 1
+            version = self._versions.get(category_id, 0)
+
+        schema = self._compile(category_id, version)
+        if schema is None:
+            return None
+
+        # Solo se guarda si nadie invalidó la categoría mientras se cargaba
+        with self._lock:
+            if self._versions.get(category_id, 0) == version:
+                self._schemas[category_id] = schema
+                self._checked[category_id] = time.monotonic()
+        return schema
+
+    def invalidate(self, category_id):
+        category_id = int(category_id)
+        with self._lock:
+            self._versions[category_id] = self._versions.get(category_id, 0) + 1
+            self._schemas.pop(category_id, None)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            for category_id in list(self._schemas):
+                self._versions[category_id] = self._versions.get(category_id, 0) + 1
+            self._schemas.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'revalidations': self.revalidations,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+                'size': len(self._schemas)
+            }
+
+    def _compile(self, category_id, version):
+        # Una sola consulta: categoría + campos + opciones
+        category = (
+            Category.query
+            .options(joinedload(Category.fields).joinedload(CategoryField.options))
+            .filter_by(id=category_id)
+            .one_or_none()
+        )
+        if category is None:
+            return None
+
+        fields = []
+        for field in sorted(category.fields, key=lambda f: f.id):
+            options = None
+            active_options = None
+            if field.field_type == 'select':
+                options = [opt.to_dict() for opt in sorted(field.options, key=lambda o: o.id)]
+                active_options = frozenset(opt['value'] for opt in options if opt['active'])
+            fields.append({
+                'id': field.id,
+                'category_id': field.category_id,
+                'name': field.name,
+                'field_type': field.field_type,
+                'required': field.required,
+                'active': field.active,
+                'options': options,
+                'active_options': active_options
+            })
+
+        return {
+            'version': version,
+            'schema_version': category.schema_version,
+            'category': category.to_dict(),
+            'fields': fields,
+            'fields_by_id': {f['id']: f for f in fields}
+        }
+
+
+def bump_schema_version(category_ids):
+    # Se llama antes del commit que cambia campos u opciones, en la misma transacción
+    if category_ids:
+        db.session.execute(
+            update(Category)
+            .where(Category.id.in_(category_ids))
+            .values(schema_version=Category.schema_version + 1)
+        )
+
+
+def field_to_dict(field):
+    # Misma forma que CategoryField.to_dict(), a partir del esquema compilado
+    return {k: v for k, v in field.items() if k != 'active_options'}
+
+
+def category_to_dict(schema):
+    data = dict(schema['category'])
+    data['fields'] = [field_to_dict(f) for f in schema['fields']]
+    return data
+
+
+schema_cache = SchemaCache()
@@ -0,0 +1,211 @@
+import math
+from datetime import datetime
+from sqlalchemy import delete, func, insert, tuple_
+from extensions import db
+from models.models import CategoryField, FormValue, FormValueIndex
+
+TEXT_MAX_LENGTH = 191
+ESTIMATE_CAP = 10000
+SCAN_CHUNK_SIZE = 1000
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+OPERATORS = {'eq', 'in', 'gt', 'gte', 'lt', 'lte', 'between'}
+SKIPPED_TYPES = {'image'}
+
+
+class InvalidFilter(ValueError):
+    pass
+
+
+def normalize_text(value):
+    return ' '.join(str(value).split()).lower()[:TEXT_MAX_LENGTH]
+
+
+def parse_number(value):
+    # nan/inf no son comparables y MySQL no los acepta en una columna numérica
+    number = float(str(value).strip().replace(',', ''))
+    if not math.isfinite(number):
+        raise ValueError(f'Non-finite number {value!r}')
+    return number
+
+
+def parse_date(value):
+    return datetime.fromisoformat(str(value).strip())
+
+
+def typed_row(submission_id, field_id, field_type, value):
+    # Fila para form_value_index, o None si el valor no se indexa
+    if value is None or field_type in SKIPPED_TYPES:
+        return None
+    text = normalize_text(value)
+    if not text:
+        return None
+
+    row = {
+        'submission_id': submission_id,
+        'field_id': field_id,
+        'value_text': text,
+        'value_number': None,
+        'value_date': None
+    }
+    if field_type == 'number':
+        try:
+            row['value_number'] = parse_number(value)
+        except ValueError:
+            pass
+    elif field_type in ('date', 'datetime'):
+        try:
+            row['value_date'] = parse_date(value)
+        except ValueError:
+            pass
+    return row
+
+
+def index_rows(rows):
+    # rows: diccionarios de typed_row(); inserción multi-fila en una sola ejecución
+    rows = [row for row in rows if row is not None]
+    if rows:
+        db.session.execute(insert(FormValueIndex.__table__), rows)
+    return len(rows)
+
+
+def rebuild(category_id=None, batch_size=SCAN_CHUNK_SIZE):
+    # Reconstruye el índice a partir de form_values, un rango de FormValue.id
+    # por transacción: se borran y reinsertan solo los pares (submission,
+    # campo) de ese rango, así las búsquedas nunca ven el índice vacío y lo
+    # indexado al insertar durante la reconstrucción no se duplica.
+    indexed = 0
+    last_id = 0
+    while True:
+        query = db.session.query(
+            FormValue.id, FormValue.submission_id, FormValue.field_id,
+            CategoryField.field_type, FormValue.value
+        ).join(CategoryField, CategoryField.id == FormValue.field_id).filter(FormValue.id > last_id)
+        if category_id is not None:
+            query = query.filter(CategoryField.category_id == category_id)
+        batch = query.order_by(FormValue.id).limit(batch_size).all()
+        if not batch:
+            break
+
+        pairs = {(row.submission_id, row.field_id) for row in batch}
+        db.session.execute(delete(FormValueIndex.__table__).where(
+            tuple_(FormValueIndex.submission_id, FormValueIndex.field_id).in_(pairs)
+        ))
+        indexed += index_rows(
+            typed_row(submission_id, field_id, field_type, value)
+            for _, submission_id, field_id, field_type, value in batch
+        )
+        db.session.commit()
+        last_id = batch[-1].id
+
+    return indexed
+
+
+def _column_for(field_type):
+    if field_type == 'number':
+        return FormValueIndex.value_number, parse_number
+    if field_type in ('date', 'datetime'):
+        return FormValueIndex.value_date, parse_date
+    return FormValueIndex.value_text, normalize_text
+
+
+def compile_filter(item, fields_by_id):
+    # {"field_id": 2, "op": "gt", "value": 10} -> condición sobre el índice
+    try:
+        field = fields_by_id[int(item['field_id'])]
+    except (KeyError, TypeError, ValueError):
+        raise InvalidFilter('Unknown field_id')
+    if field['field_type'] in SKIPPED_TYPES:
+        raise InvalidFilter(f"Field {field['id']} is not searchable")
+
+    op = item.get('op', 'eq')
+    if op not in OPERATORS:
+        raise InvalidFilter(f'Unknown op {op!r}')
+
+    column, parse = _column_for(field['field_type'])
+    value = item.get('value')
+    if op == 'in' and not isinstance(value, list):
+        raise InvalidFilter(f"Op 'in' needs a list of values for field {field['id']}")
+    if op == 'between' and not (isinstance(value, list) and len(value) == 2):
+        raise InvalidFilter(f"Op 'between' needs [low, high] for field {field['id']}")
+
+    try:
+        if op == 'in':
+            condition = column.in_([parse(v) for v in value])
+        elif op == 'between':
+            low, high = value
+            condition = column.between(parse(low), parse(high))
+        else:
+            value = parse(value)
+            condition = {
+                'eq': column == value,
+                'gt': column > value,
+                'gte': column >= value,
+                'lt': column < value,
+                'lte': column <= value
+            }[op]
+    except (TypeError, ValueError):
+        raise InvalidFilter(f"Invalid value for field {field['id']}")
+
+    return (FormValueIndex.field_id == field['id'], condition)
+
+
+def _estimate(conditions):
+    # Conteo acotado: el costo nunca pasa de ESTIMATE_CAP entradas del índice
+    matches = db.session.query(FormValueIndex.submission_id).filter(*conditions).limit(ESTIMATE_CAP)
+    return db.session.query(func.count()).select_from(matches.subquery()).scalar()
+
+
+def plan(filters):
+    # Ordena los predicados del más al menos selectivo
+    estimates = [(_estimate(conditions), i, conditions) for i, conditions in enumerate(filters)]
+    estimates.sort(key=lambda e: (e[0], e[1]))
+    return [(estimate, conditions) for estimate, _, conditions in estimates]
+
+
+def search(filters, after=None, limit=DEFAULT_LIMIT):
+    # Devuelve (ids de submissions en orden descendente, siguiente cursor).
+    # El predicado más selectivo se recorre por bloques y el resto se
+    # verifica solo sobre esos candidatos, así el costo sigue al resultado.
+    if not filters:
+        raise InvalidFilter('At least one filter is required')
+
+    ordered = plan(filters)
+    if ordered[0][0] == 0:
+        return [], None
+
+    driver = ordered[0][1]
+    probes = [conditions for _, conditions in ordered[1:]]
+
+    results = []
+    while len(results) <= limit:
+        query = db.session.query(FormValueIndex.submission_id).filter(*driver)
+        if after is not None:
+            query = query.filter(FormValueIndex.submission_id < after)
+        chunk = [
+            row.submission_id for row in
+            query.distinct().order_by(FormValueIndex.submission_id.desc()).limit(SCAN_CHUNK_SIZE)
+        ]
+        if not chunk:
+            break
+        after = chunk[-1]
+
+        candidates = set(chunk)
+        for conditions in probes:
+            matched = db.session.query(FormValueIndex.submission_id).filter(
+                *conditions, FormValueIndex.submission_id.in_(candidates)
+            )
+            candidates = {row.submission_id for row in matched}
+            if not candidates:
+                break
+
+        results.extend(submission_id for submission_id in chunk if submission_id in candidates)
+        if len(chunk) < SCAN_CHUNK_SIZE:
+            break
+
+    next_cursor = None
+    if len(results) > limit:
+        results = results[:limit]
+        next_cursor = results[-1]
+    return results, next_cursor
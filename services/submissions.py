@@ -0,0 +1,145 @@
+import base64
+from datetime import datetime, timezone
+from sqlalchemy import literal, or_
+from extensions import db
+from models.models import ArchivedFormSubmission, ArchivedFormValue, FormSubmission, FormValue
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def parse_datetime(value):
+    # ISO 8601 a datetime naive en UTC, como los que guarda datetime.utcnow
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def encode_cursor(created_at, submission_id):
+    raw = f'{created_at.isoformat()}|{submission_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, submission_id = base64.urlsafe_b64decode(padded).decode().split('|')
+        return datetime.fromisoformat(created_at), int(submission_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+
+
+def _page_query(model, category_id, key, start, end, limit, archived):
+    query = db.session.query(
+        model.id,
+        model.category_id,
+        model.created_at,
+        model.active,
+        literal(archived).label('archived')
+    ).filter(model.category_id == category_id)
+
+    if key is not None:
+        # (created_at, id) < (c, i) escrito sin constructor de fila: MySQL
+        # no convierte la comparación de tuplas en un rango sobre el índice
+        created_at, submission_id = key
+        query = query.filter(
+            model.created_at <= created_at,
+            or_(model.created_at < created_at, model.id < submission_id)
+        )
+    if start is not None:
+        query = query.filter(model.created_at >= start)
+    if end is not None:
+        query = query.filter(model.created_at < end)
+
+    return query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+
+
+def fetch_page(category_id, cursor=None, limit=DEFAULT_PAGE_SIZE, start=None, end=None,
+               include_archived=False):
+    # Página ordenada de la más reciente a la más antigua por (created_at, id).
+    # Devuelve (filas, siguiente cursor); las filas son tuplas, no objetos ORM.
+    # Con include_archived se mezcla con form_submissions_archive; sin él, el
+    # archivo se consulta cuando la página de la tabla viva sale incompleta,
+    # así al paginar hasta el final se llega también a lo archivado.
+    key = decode_cursor(cursor) if cursor else None
+
+    rows = _page_query(FormSubmission, category_id, key, start, end, limit, False)
+    if include_archived or len(rows) <= limit:
+        rows += _page_query(ArchivedFormSubmission, category_id, key, start, end, limit, True)
+        rows.sort(key=lambda row: (row.created_at, row.id, not row.archived), reverse=True)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return rows, next_cursor
+
+
+def fetch_by_ids(submission_ids):
+    # Filas de submissions vivas en el mismo orden que submission_ids
+    if not submission_ids:
+        return []
+    rows = db.session.query(
+        FormSubmission.id,
+        FormSubmission.category_id,
+        FormSubmission.created_at,
+        FormSubmission.active,
+        literal(False).label('archived')
+    ).filter(FormSubmission.id.in_(submission_ids)).all()
+    by_id = {row.id: row for row in rows}
+    return [by_id[i] for i in submission_ids if i in by_id]
+
+
+def submission_key(row):
+    # Un id archivado puede repetirse en la tabla viva (MySQL < 8 reutiliza
+    # ids tras reiniciar), así que la fuente forma parte de la clave
+    return (bool(row.archived), row.id)
+
+
+def fetch_values(rows):
+    # Una consulta para los valores de la página (dos si hay archivadas).
+    # Devuelve {submission_key(row): [(id, field_id, value), ...]}
+    values = {submission_key(row): [] for row in rows}
+    sources = (
+        (False, FormValue, [row.id for row in rows if not row.archived]),
+        (True, ArchivedFormValue, [row.id for row in rows if row.archived])
+    )
+
+    for archived, model, ids in sources:
+        if not ids:
+            continue
+        result = db.session.query(
+            model.submission_id, model.id, model.field_id, model.value
+        ).filter(model.submission_id.in_(ids)).order_by(model.id)
+
+        for submission_id, value_id, field_id, value in result:
+            values[(archived, submission_id)].append((value_id, field_id, value))
+    return values
+
+
+def submission_to_dict(row, values, fields_by_id):
+    # Misma forma que FormSubmission.to_dict(include_values=True);
+    # values es el diccionario que devuelve fetch_values()
+    data = {
+        'id': row.id,
+        'category_id': row.category_id,
+        'created_at': row.created_at.isoformat() if row.created_at else None,
+        'active': row.active
+    }
+    data['values'] = []
+    for value_id, field_id, value in values.get(submission_key(row), []):
+        field = fields_by_id.get(field_id, {})
+        data['values'].append({
+            'id': value_id,
+            'field_id': field_id,
+            'field_name': field.get('name'),
+            'field_type': field.get('field_type'),
+            'value': value
+        })
+    return data
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+from services import archive
+
+
+def archive_all(app):
+    with app.app_context():
+        return archive.archive(datetime(9999, 1, 1), pause=0)
+
+
+def test_archived_ids_are_not_reused(app, client):
+    client.post('/submissions', data={'category_id': 1, 'field_1': 'one'})
+    assert archive_all(app) == 1
+
+    response = client.post('/submissions', data={'category_id': 1, 'field_1': 'two'})
+    assert response.status_code == 201
+    assert response.get_json()['id'] == 2
+
+    items = client.get('/categories/1/submissions?include_archived=1').get_json()['items']
+    assert [(item['id'], [v['value'] for v in item['values']]) for item in items] == [
+        (2, ['two']), (1, ['one'])
+    ]
+
+    assert archive_all(app) == 1
+
+
+def test_export_includes_archived_submissions(app, client):
+    for label in ('a', 'b', 'c', 'd'):
+        client.post('/submissions', data={'category_id': 1, 'field_1': label})
+    with app.app_context():
+        archive.archive_batch([2, 3, 4])
+
+    lines = client.get('/categories/1/export').get_data(as_text=True).splitlines()
+    assert [line.split(',')[0] for line in lines] == ['submission_id', '1', '2', '3', '4']
+
+    lines = client.get('/categories/1/export?include_archived=0').get_data(as_text=True).splitlines()
+    assert [line.split(',')[0] for line in lines] == ['submission_id', '1']
+
+
+def test_listing_pages_into_archive(app, client):
+    for label in ('a', 'b', 'c', 'd', 'e'):
+        client.post('/submissions', data={'category_id': 1, 'field_1': label})
+    with app.app_context():
+        archive.archive_batch([1, 2, 3])
+
+    seen = []
+    cursor = None
+    while True:
+        params = {'limit': 2}
+        if cursor:
+            params['cursor'] = cursor
+        page = client.get('/categories/1/submissions', query_string=params).get_json()
+        seen += [(item['id'], item['values'][0]['value']) for item in page['items']]
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+
+    assert seen == [(5, 'e'), (4, 'd'), (3, 'c'), (2, 'b'), (1, 'a')]
@@ -0,0 +1,33 @@
+import json
+
+
+def test_created_at_offsets_are_stored_as_utc(client):
+    body = '\n'.join([
+        json.dumps({'category_id': 1, 'created_at': '2024-01-01T00:00:00+02:00', 'values': {'1': 'a'}}),
+        json.dumps({'category_id': 1, 'created_at': '2024-01-01T00:00:00', 'values': {'1': 'b'}})
+    ])
+    lines = client.post('/submissions/bulk', data=body).get_data(as_text=True).splitlines()
+    assert json.loads(lines[-1])['summary']['inserted'] == 2
+
+    items = client.get('/categories/1/submissions').get_json()['items']
+    assert [(item['values'][0]['value'], item['created_at']) for item in items] == [
+        ('b', '2024-01-01T00:00:00'), ('a', '2023-12-31T22:00:00')
+    ]
+
+    page = client.get('/categories/1/submissions?from=2024-01-01T01:00:00%2B02:00').get_json()
+    assert [item['values'][0]['value'] for item in page['items']] == ['b']
+
+
+def test_ids_without_returning_are_read_back_by_ingest_key(app, client, monkeypatch):
+    from extensions import db
+
+    with app.app_context():
+        monkeypatch.setattr(db.engine.dialect, 'insert_executemany_returning_sort_by_parameter_order', False)
+
+    body = '\n'.join(json.dumps({'category_id': 1, 'values': {'1': str(i)}}) for i in range(7))
+    lines = client.post('/submissions/bulk?batch_size=3', data=body).get_data(as_text=True).splitlines()
+    results = [json.loads(line) for line in lines[:-1]]
+
+    items = client.get('/categories/1/submissions?limit=10').get_json()['items']
+    value_by_id = {item['id']: item['values'][0]['value'] for item in items}
+    assert [value_by_id[r['submission_id']] for r in results] == [str(i) for i in range(7)]
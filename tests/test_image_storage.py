@@ -0,0 +1,23 @@
+import io
+
+from werkzeug.datastructures import FileStorage
+
+from services import image_storage
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 32
+
+
+def test_same_content_is_stored_once_under_detected_format(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_storage, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setattr(image_storage, 'Image', object())
+    queued = []
+    monkeypatch.setattr(image_storage.variant_workers, 'submit', lambda fn, *args: queued.append(args))
+
+    urls = [
+        image_storage.store(FileStorage(io.BytesIO(PNG), filename=f'photo.{ext}'), ext)
+        for ext in ('jpg', 'png', 'png')
+    ]
+
+    assert len(set(urls)) == 1 and urls[0].endswith('.png')
+    assert len(queued) == 1
+    assert [p.name for p in tmp_path.rglob('*') if p.is_file()] == [urls[0].rsplit('/', 1)[1]]
@@ -0,0 +1,26 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models.models import FormValueIndex
+from services import search_index
+
+
+def test_rebuild_replaces_entries_by_range(app, client):
+    for label in ('bolt', 'nut', 'washer'):
+        client.post('/submissions', data={'category_id': 1, 'field_1': label})
+
+    with app.app_context():
+        # Entrada obsoleta: la reconstrucción la reemplaza sin duplicarla
+        db.session.query(FormValueIndex).filter_by(submission_id=1).update({'value_text': 'stale'})
+        db.session.commit()
+
+        assert search_index.rebuild(batch_size=2) == 3
+        assert search_index.rebuild(batch_size=2) == 3
+        entries = db.session.query(FormValueIndex.submission_id, FormValueIndex.value_text)
+        assert sorted(entries) == [(1, 'bolt'), (2, 'nut'), (3, 'washer')]
+
+        db.session.add(FormValueIndex(submission_id=1, field_id=1, value_text='bolt'))
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()